@@ -57,8 +57,11 @@ async def get_workflow_config():
         data = json.load(f)
     return {"stages": [s["id"] for s in data["stages"]]}
 
+# Graph runs are synchronous, so endpoints that invoke the graph are plain `def`:
+# FastAPI runs them in its threadpool, letting concurrent invoices overlap and
+# share POSTING batches instead of blocking the event loop one at a time.
 @app.post("/workflow/start")
-async def start_workflow(payload: InvoicePayload):
+def start_workflow(payload: InvoicePayload):
     thread_id = str(uuid.uuid4())
     config = {"configurable": {"thread_id": thread_id}}
     active_threads[thread_id] = config
@@ -91,7 +94,7 @@ async def start_workflow(payload: InvoicePayload):
 async def get_pending_reviews():
     # Strict alignment with Appendix-1: checkpoint_id, invoice_id, vendor_name, amount, created_at, reason_for_hold, review_url
     pending = []
-    for thread_id, config in active_threads.items():
+    for thread_id, config in list(active_threads.items()):
         state = invoice_graph.get_state(config)
         if state.next and state.next[0] == "HITL_DECISION":
             snapshot = state.values
@@ -111,7 +114,7 @@ async def get_pending_reviews():
 async def get_workflow_logs():
     # Return the logs of all active and completed threads for the dashboard
     logs = []
-    for thread_id, config in active_threads.items():
+    for thread_id, config in list(active_threads.items()):
         state = invoice_graph.get_state(config)
         snapshot = state.values
         if snapshot:
@@ -136,7 +139,7 @@ async def visualize_workflow():
     return HTMLResponse(content=f'<html><body style="background:#0a0e17;display:flex;justify-content:center;padding:50px;"><img src="{image_url}" style="max-width:100%;box-shadow:0 0 50px rgba(79,70,229,0.2);border-radius:10px;"/></body></html>')
 
 @app.post("/human-review/decision")
-async def submit_decision(payload: DecisionPayload):
+def submit_decision(payload: DecisionPayload):
     # Strict alignment with Appendix-1: request includes checkpoint_id, decision, notes, reviewer_id
     thread_id = payload.checkpoint_id
     
@@ -145,6 +148,8 @@ async def submit_decision(payload: DecisionPayload):
         active_threads[thread_id] = config
     
     config = active_threads[thread_id]
+    # An approval escalation resumes at POSTING; a failed match resumes at RECONCILE
+    escalated = invoice_graph.get_state(config).values.get("approval_status") == "ESCALATED"
     
     # Update state with decision
     invoice_graph.update_state(config, {
@@ -159,7 +164,7 @@ async def submit_decision(payload: DecisionPayload):
     # Response schema: resume_token, next_stage
     return {
         "resume_token": f"token-{thread_id}",
-        "next_stage": "RECONCILE" if payload.decision == "ACCEPT" else "END"
+        "next_stage": ("POSTING" if escalated else "RECONCILE") if payload.decision == "ACCEPT" else "END"
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+import json
+import os
+import random
+import timeit
+
+from policy import load_policies
+
+ITERATIONS = 200_000
+BATCH_SIZE = 10_000
+
+
+def load_config():
+    config_path = os.path.join(os.path.dirname(__file__), "workflow.json")
+    with open(config_path, "r") as f:
+        return json.load(f)
+
+
+def make_state(rng: random.Random):
+    currency = rng.choice(["USD", "EUR", "GBP", "JPY"])
+    return {
+        "invoice_payload": {
+            "amount": rng.choice([500.0, 5_000.0, 25_000.0, 250_000.0]),
+            "currency": currency.lower(),
+        },
+        "normalized_invoice": {"currency": currency},
+        "flags": {"missing_info": [], "risk_score": rng.random()},
+        "match_result": rng.choice(["MATCHED", "FAILED"]),
+    }
+
+
+def legacy_route(state, condition_str="input_state.match_result == 'FAILED'"):
+    # The previous routing closure: per-call context object plus substring check
+    context = {"input_state": type('obj', (object,), state)}
+    if "match_result == 'FAILED'" in condition_str and state.get("match_result") == "FAILED":
+        return "CHECKPOINT_HITL"
+    return "RECONCILE"
+
+
+def report(label, seconds, count):
+    print(f"{label:<40} {seconds / count * 1e9:>10.1f} ns/eval")
+
+
+def run():
+    wf_config = load_config()
+    needs_review, approval_policy = load_policies(wf_config)
+    rng = random.Random(42)
+    state = make_state(rng)
+    states = [make_state(rng) for _ in range(BATCH_SIZE)]
+
+    print(f"Per-evaluation cost ({ITERATIONS} iterations)")
+    report("legacy route_after_match", timeit.timeit(lambda: legacy_route(state), number=ITERATIONS), ITERATIONS)
+    report("compiled trigger_condition", timeit.timeit(lambda: needs_review(state), number=ITERATIONS), ITERATIONS)
+    report("compiled approval policy", timeit.timeit(lambda: approval_policy.evaluate(state), number=ITERATIONS), ITERATIONS)
+
+    print(f"\nBatch what-if analysis ({BATCH_SIZE} invoices)")
+    report("evaluate_many (current config)", timeit.timeit(lambda: approval_policy.evaluate_many(states), number=10), 10 * BATCH_SIZE)
+
+    compile_time = timeit.timeit(lambda: load_policies(wf_config, {"auto_approve_limit": 50_000}), number=100) / 100
+    print(f"{'compile policies':<40} {compile_time * 1e6:>10.1f} us/build")
+
+    for limit in (1_000, 10_000, 50_000):
+        _, what_if = load_policies(wf_config, {"auto_approve_limit": limit})
+        decisions = what_if.evaluate_many(states)
+        auto = sum(1 for d in decisions if d.approval_status == "AUTO_APPROVED")
+        print(f"auto_approve_limit={limit:<8} auto-approved {auto}/{BATCH_SIZE}")
+
+
+if __name__ == "__main__":
+    run()
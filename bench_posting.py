@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from posting import PostingCoalescer, PostingRequest, PostingResult, batch_id_for
+
+INVOICES = 400
+CONCURRENCY = 64
+ERP_CALL_LATENCY = 0.020     # fixed round-trip cost of one ERP API call
+ERP_DOC_LATENCY = 0.0002     # incremental cost per document in a bulk call
+ERP_CONCURRENT_CALLS = 4     # rate limit: calls the ERP serves at once per tenant
+
+
+class SimulatedERP:
+    """
+    Stand-in for a rate-limited bulk ERP endpoint with per-call latency.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(ERP_CONCURRENT_CALLS)
+
+    def submit(self, batch_id, requests):
+        with self.lock:
+            self.calls += 1
+        with self.slots:
+            time.sleep(ERP_CALL_LATENCY + ERP_DOC_LATENCY * len(requests))
+        return {
+            r.idempotency_key: PostingResult(True, f"ERP-{r.invoice_id}", f"PAY-{r.invoice_id}", "mock_erp", batch_id)
+            for r in requests
+        }
+
+
+def make_request(i):
+    return PostingRequest(f"post:INV-{i:05d}:TAX-{i % 17}", f"INV-{i:05d}", 1000.0 + i, "USD", [])
+
+
+def run_case(label, max_batch_size, max_wait_ms):
+    erp = SimulatedERP()
+    coalescer = PostingCoalescer(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, submit_batch=erp.submit)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(coalescer.post, (make_request(i) for i in range(INVOICES))))
+    elapsed = time.perf_counter() - start
+    assert all(r.posted for r in results)
+    print(f"{label:<28} erp_calls={erp.calls:<5} postings/sec={INVOICES / elapsed:>8.1f}  wall={elapsed:.2f}s")
+
+
+def run_unbatched():
+    # Baseline: one ERP call per invoice, as the POSTING stage did before coalescing
+    erp = SimulatedERP()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(lambda r: erp.submit(batch_id_for([r.idempotency_key]), [r]), (make_request(i) for i in range(INVOICES))))
+    elapsed = time.perf_counter() - start
+    print(f"{'per-invoice calls':<28} erp_calls={erp.calls:<5} postings/sec={INVOICES / elapsed:>8.1f}  wall={elapsed:.2f}s")
+
+
+def run_retry_check():
+    # A batch that fails once is retried under the same batch id and keys
+    seen = []
+    erp = SimulatedERP()
+
+    def flaky(batch_id, requests):
+        seen.append((batch_id, tuple(r.idempotency_key for r in requests)))
+        if len(seen) == 1:
+            raise ConnectionError("ERP connection reset")
+        return erp.submit(batch_id, requests)
+
+    coalescer = PostingCoalescer(max_batch_size=8, max_wait_ms=10, backoff_seconds=0.01, submit_batch=flaky)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(coalescer.post, (make_request(i) for i in range(8))))
+    assert seen[0] == seen[1], "retry changed the batch id or idempotency keys"
+    print(f"\nRetry reused batch id and keys (attempts={coalescer.stats['erp_attempts']})")
+
+
+def run():
+    print(f"{INVOICES} invoices, {CONCURRENCY} concurrent threads, simulated ERP latency {ERP_CALL_LATENCY * 1000:.0f}ms/call, {ERP_CONCURRENT_CALLS} concurrent calls\n")
+    run_unbatched()
+    for max_wait_ms in (1, 5, 25, 100):
+        run_case(f"window={max_wait_ms}ms batch<=50", 50, max_wait_ms)
+    run_case("window=25ms batch<=200", 200, 25)
+    run_retry_check()
+
+
+if __name__ == "__main__":
+    run()
@@ -1,7 +1,10 @@
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.sqlite import SqliteSaver
 from state import InvoiceState
+from policy import load_policies
+from posting import PostingCoalescer
 import nodes
+import functools
 import sqlite3
 import json
 import os
@@ -14,6 +17,11 @@ def build_graph():
 
     workflow = StateGraph(InvoiceState)
 
+    # Compile the HITL trigger condition and approval rules once, at build time
+    needs_review, approval_policy = load_policies(wf_config)
+    # Shared across invoice threads so concurrent POSTING stages coalesce into bulk ERP calls
+    posting_coalescer = PostingCoalescer.from_config(wf_config)
+
     # Dynamically Map nodes from JSON
     # This proves the implementation is driven by the configuration deliverable
     node_map = {
@@ -25,8 +33,8 @@ def build_graph():
         "CHECKPOINT_HITL": nodes.checkpoint_node,
         "HITL_DECISION": nodes.hitl_decision_node,
         "RECONCILE": nodes.reconcile_node,
-        "APPROVE": nodes.approve_node,
-        "POSTING": nodes.posting_node,
+        "APPROVE": functools.partial(nodes.approve_node, policy=approval_policy),
+        "POSTING": functools.partial(nodes.posting_node, coalescer=posting_coalescer),
         "NOTIFY": nodes.notify_node,
         "COMPLETE": nodes.complete_node,
     }
@@ -57,21 +65,10 @@ def build_graph():
             nxt_id = stages_list[i+1]["id"]
             
             if curr_id == "MATCH_TWO_WAY":
-                # Find the stage with a trigger_condition (Stage 6)
-                checkpoint_stage = next((s for s in wf_config["stages"] if s.get("trigger_condition")), None)
-                condition_str = checkpoint_stage["trigger_condition"] if checkpoint_stage else "False"
-                
-                # Dynamic routing based on JSON condition string
+                # Dynamic routing based on the compiled trigger_condition (Stage 6)
                 def route_after_match(state: InvoiceState):
-                    # Map the JSON condition 'input_state.match_result == 'FAILED'' to Python
-                    # We can use a simple check or eval for full dynamism
-                    context = {"input_state": type('obj', (object,), state)}
-                    try:
-                        # For the interview, a safe direct check is preferred over eval for robustness
-                        # but we show we can handle the logic from the JSON string
-                        if "match_result == 'FAILED'" in condition_str and state.get("match_result") == "FAILED":
-                            return "CHECKPOINT_HITL"
-                    except: pass
+                    if needs_review(state):
+                        return "CHECKPOINT_HITL"
                     return "RECONCILE"
                 
                 workflow.add_conditional_edges("MATCH_TWO_WAY", route_after_match)
@@ -81,9 +78,28 @@ def build_graph():
                     # Appendix-1: finalize with status 'MANUAL_HANDOFF'
                     if state.get("workflow_status") == "MANUAL_HANDOFF":
                         return END
+                    # An approver accepting an escalation resumes straight at POSTING
+                    if state.get("approval_status") == "APPROVED":
+                        return "POSTING"
                     return "RECONCILE"
                 workflow.add_conditional_edges("HITL_DECISION", route_after_hitl)
             
+            elif curr_id == "APPROVE":
+                def route_after_approve(state: InvoiceState):
+                    # Escalated invoices pause at the HITL checkpoint for their approver
+                    if state.get("approval_status") != "AUTO_APPROVED":
+                        return "CHECKPOINT_HITL"
+                    return "POSTING"
+                workflow.add_conditional_edges("APPROVE", route_after_approve)
+
+            elif curr_id == "POSTING":
+                def route_after_posting(state: InvoiceState):
+                    # A rejected or failed posting ends the run; nobody is notified of a payment
+                    if not state.get("posted"):
+                        return END
+                    return "NOTIFY"
+                workflow.add_conditional_edges("POSTING", route_after_posting)
+
             elif curr_id == "CHECKPOINT_HITL":
                 workflow.add_edge("CHECKPOINT_HITL", "HITL_DECISION")
             
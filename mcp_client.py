@@ -1,5 +1,11 @@
+import hashlib
 from typing import Any, Dict
 
+
+def _stable_id(prefix: str, key: str) -> str:
+    # Simulated ERP dedupe: the same idempotency key always maps to the same document
+    return f"{prefix}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:10].upper()}"
+
 class MCPClient:
     """
     MCP Client to route calls to COMMON or ATLAS servers.
@@ -61,11 +67,30 @@ class MCPClient:
             elif ability == "accept_or_reject_invoice":
                 return {"human_decision": params.get("decision", "ACCEPT"), "reviewer_id": "REV-001"}
             elif ability == "apply_invoice_approval_policy":
-                return {"approval_status": "AUTO_APPROVED", "approver_id": "SYSTEM"}
+                return {
+                    "approval_status": params.get("approval_status", "AUTO_APPROVED"),
+                    "approver_id": params.get("approver_id", "SYSTEM")
+                }
             elif ability == "post_to_erp":
                 return {"posted": True, "erp_txn_id": "ERP-XYZ"}
             elif ability == "schedule_payment":
                 return {"scheduled_payment_id": "PAY-888"}
+            elif ability == "bulk_post_to_erp":
+                return {
+                    "batch_id": params["batch_id"],
+                    "results": [
+                        {"idempotency_key": d["idempotency_key"], "posted": True, "erp_txn_id": _stable_id("ERP", d["idempotency_key"])}
+                        for d in params["documents"]
+                    ]
+                }
+            elif ability == "bulk_schedule_payment":
+                return {
+                    "batch_id": params["batch_id"],
+                    "results": [
+                        {"idempotency_key": d["idempotency_key"], "scheduled_payment_id": _stable_id("PAY", d["idempotency_key"])}
+                        for d in params["documents"]
+                    ]
+                }
             elif ability == "notify_vendor":
                 return {"email_sent": True}
             elif ability == "notify_finance_team":
@@ -1,7 +1,10 @@
 from datetime import datetime
+from typing import Optional
 from state import InvoiceState
 from bigtool import BigtoolPicker
 from mcp_client import MCPClient
+from policy import ApprovalPolicy
+from posting import PostingCoalescer, PostingError, PostingRequest, posting_idempotency_key
 
 def intake_node(state: InvoiceState):
     print("--- INTAKE ---")
@@ -33,9 +36,17 @@ def prepare_node(state: InvoiceState):
     flags = MCPClient.execute_ability("COMMON", "compute_flags", {})
     
     vendor["enrichment_meta"] = meta["enrichment_meta"]
+
+    payload = state["invoice_payload"]
+    normalized_invoice = {
+        "amount": payload.get("amount"),
+        "currency": str(payload.get("currency") or "").strip().upper(),
+        "line_items": payload.get("line_items", []),
+    }
     
     return {
         "vendor_profile": vendor,
+        "normalized_invoice": normalized_invoice,
         "flags": flags,
         "audit_log": state["audit_log"] + [f"Langie: Normalized vendor and enriched profile using {enrich_tool}."]
     }
@@ -70,6 +81,18 @@ def match_node(state: InvoiceState):
 
 def checkpoint_node(state: InvoiceState):
     print("--- CHECKPOINT_HITL ---")
+    if state.get("approval_status") == "ESCALATED":
+        # Escalated by the approval policy: the approver decides via the same review flow
+        db_tool = BigtoolPicker.select("db", ["postgres", "sqlite", "dynamodb"])
+        result = MCPClient.execute_ability("COMMON", "save_state_for_human_review", {"db": db_tool})
+        return {
+            "checkpoint_id": result["checkpoint_id"],
+            "review_url": result["review_url"],
+            "paused_reason": f"Escalated to {state.get('approver_id')} by approval policy",
+            "workflow_status": "PAUSED",
+            "audit_log": state["audit_log"] + [f"Langie: Triggered HITL checkpoint for approval by {state.get('approver_id')} (Stored in {db_tool})."]
+        }
+
     if state["match_result"] != "FAILED":
         return {} # Should not be reached if routing is correct
         
@@ -97,6 +120,14 @@ def hitl_decision_node(state: InvoiceState):
             "workflow_status": "MANUAL_HANDOFF",
         "audit_log": state["audit_log"] + ["Langie: Human REJECTED invoice. Finalizing with MANUAL_HANDOFF status."]
         }
+
+    if state.get("approval_status") == "ESCALATED":
+        return {
+            "approval_status": "APPROVED",
+            "approver_id": state.get("reviewer_id"),
+            "workflow_status": "IN_PROGRESS",
+            "audit_log": state["audit_log"] + [f"Langie: Escalated invoice APPROVED by {state.get('reviewer_id')}. Resuming at POSTING."]
+        }
     
     return {
         "workflow_status": "IN_PROGRESS",
@@ -111,26 +142,71 @@ def reconcile_node(state: InvoiceState):
         "audit_log": state["audit_log"] + ["Langie: Reconstructed accounting entries and ledger records."]
     }
 
-def approve_node(state: InvoiceState):
+def approve_node(state: InvoiceState, policy: Optional[ApprovalPolicy] = None):
     print("--- APPROVE ---")
-    result = MCPClient.execute_ability("ATLAS", "apply_invoice_approval_policy", {})
+    params = {}
+    rule = "default"
+    if policy is not None:
+        decision = policy.evaluate(state)
+        params = {"approval_status": decision.approval_status, "approver_id": decision.approver_id}
+        rule = decision.rule
+    result = MCPClient.execute_ability("ATLAS", "apply_invoice_approval_policy", params)
+    if result["approval_status"] != "AUTO_APPROVED":
+        return {
+            "approval_status": result["approval_status"],
+            "approver_id": result["approver_id"],
+            "audit_log": state["audit_log"] + [f"Langie: Escalated to {result['approver_id']} (rule: {rule}). Sending to human review; posting waits for approval."]
+        }
     return {
         "approval_status": result["approval_status"],
         "approver_id": result["approver_id"],
-        "audit_log": state["audit_log"] + ["Langie: Applied approval policies and verified thresholds."]
+        "audit_log": state["audit_log"] + [f"Langie: Applied approval policies and verified thresholds (rule: {rule}, status: {result['approval_status']})."]
     }
 
-def posting_node(state: InvoiceState):
+def posting_node(state: InvoiceState, coalescer: Optional[PostingCoalescer] = None):
     print("--- POSTING ---")
-    erp_tool = BigtoolPicker.select("erp_connector", ["sap_sandbox", "netsuite", "mock_erp"])
-    post = MCPClient.execute_ability("ATLAS", "post_to_erp", {"tool": erp_tool})
-    pay = MCPClient.execute_ability("ATLAS", "schedule_payment", {})
-    
+    if coalescer is None:
+        erp_tool = BigtoolPicker.select("erp_connector", ["sap_sandbox", "netsuite", "mock_erp"])
+        post = MCPClient.execute_ability("ATLAS", "post_to_erp", {"tool": erp_tool})
+        pay = MCPClient.execute_ability("ATLAS", "schedule_payment", {})
+        return {
+            "posted": post["posted"],
+            "erp_txn_id": post["erp_txn_id"],
+            "scheduled_payment_id": pay["scheduled_payment_id"],
+            "audit_log": state["audit_log"] + [f"Langie: Posted to ERP system ({erp_tool}) and scheduled payment."]
+        }
+
+    payload = state["invoice_payload"]
+    try:
+        result = coalescer.post(PostingRequest(
+            idempotency_key=posting_idempotency_key(state),
+            invoice_id=payload["invoice_id"],
+            amount=payload["amount"],
+            currency=state["normalized_invoice"]["currency"],
+            accounting_entries=state.get("accounting_entries") or [],
+        ))
+    except PostingError as e:
+        # workflow.json error_handling: persist_and_fail
+        return {
+            "posted": False,
+            "erp_txn_id": None,
+            "scheduled_payment_id": None,
+            "workflow_status": "FAILED",
+            "audit_log": state["audit_log"] + [f"Langie: ERP posting failed ({e}). Finalizing with FAILED status."]
+        }
+    if not result.posted:
+        return {
+            "posted": False,
+            "erp_txn_id": result.erp_txn_id,
+            "scheduled_payment_id": None,
+            "workflow_status": "FAILED",
+            "audit_log": state["audit_log"] + [f"Langie: ERP system ({result.erp_tool}) rejected the posting in bulk batch {result.batch_id}; no payment scheduled. Finalizing with FAILED status."]
+        }
     return {
-        "posted": post["posted"],
-        "erp_txn_id": post["erp_txn_id"],
-        "scheduled_payment_id": pay["scheduled_payment_id"],
-        "audit_log": state["audit_log"] + [f"Langie: Posted to ERP system ({erp_tool}) and scheduled payment."]
+        "posted": True,
+        "erp_txn_id": result.erp_txn_id,
+        "scheduled_payment_id": result.scheduled_payment_id,
+        "audit_log": state["audit_log"] + [f"Langie: Posted to ERP system ({result.erp_tool}) in bulk batch {result.batch_id} and scheduled payment."]
     }
 
 def notify_node(state: InvoiceState):
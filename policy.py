@@ -0,0 +1,358 @@
+import ast
+import operator
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+Condition = Callable[[Dict[str, Any]], bool]
+Getter = Callable[[Dict[str, Any]], Any]
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+class PolicyError(ValueError):
+    """
+    Raised when a workflow.json condition or approval rule cannot be compiled.
+    """
+
+
+class ApprovalDecision(NamedTuple):
+    approval_status: str
+    approver_id: str
+    rule: str
+
+
+def _constant(value: Any) -> Getter:
+    return lambda state: value
+
+
+def _membership(values) -> Any:
+    # Hash lookup when every element allows it, otherwise an equality scan
+    try:
+        return frozenset(values)
+    except TypeError:
+        return tuple(values)
+
+
+def _state_getter(path: List[str]) -> Getter:
+    # Specialise the common shallow paths so evaluation is one or two dict lookups
+    if len(path) == 1:
+        key = path[0]
+        return lambda state: state.get(key)
+    if len(path) == 2:
+        outer, inner = path
+
+        def get_nested(state):
+            value = state.get(outer)
+            return value.get(inner) if isinstance(value, dict) else None
+        return get_nested
+
+    keys = tuple(path)
+
+    def get_deep(state):
+        value = state
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+    return get_deep
+
+
+class _Compiler:
+    """
+    Compiles the small expression language used in workflow.json into closures.
+
+    `input_state.<path>` reads from the LangGraph state (missing keys are None) and
+    `config.<key>` is folded to a constant from the workflow config at compile time.
+    """
+    def __init__(self, source: str, config: Dict[str, Any]):
+        self.source = source
+        self.config = config
+
+    def compile(self) -> Condition:
+        try:
+            tree = ast.parse(self.source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise PolicyError(f"Invalid condition {self.source!r}: {e.msg}") from e
+        getter, is_const = self._expr(tree.body)
+        if is_const:
+            result = bool(getter(None))
+            return lambda state: result
+        if isinstance(tree.body, (ast.Compare, ast.BoolOp, ast.UnaryOp)):
+            return getter
+        # A bare path such as `input_state.flags.missing_info` yields the raw value
+        return lambda state: bool(getter(state))
+
+    def _fail(self, node: ast.AST) -> PolicyError:
+        return PolicyError(f"Unsupported expression {ast.unparse(node)!r} in condition {self.source!r}")
+
+    def _path(self, node: ast.AST) -> Optional[List[str]]:
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        parts.append(node.id)
+        parts.reverse()
+        return parts
+
+    def _expr(self, node: ast.AST):
+        # Returns (getter, is_constant) so constant sub-expressions fold at compile time
+        if isinstance(node, ast.Constant):
+            return _constant(node.value), True
+
+        if isinstance(node, (ast.Attribute, ast.Name)):
+            path = self._path(node)
+            if not path or len(path) < 2:
+                raise self._fail(node)
+            root, rest = path[0], path[1:]
+            if root == "input_state":
+                return _state_getter(rest), False
+            if root == "config":
+                value = self.config
+                for key in rest:
+                    if not isinstance(value, dict) or key not in value:
+                        raise PolicyError(f"Unknown config key {'.'.join(path)!r} in condition {self.source!r}")
+                    value = value[key]
+                return _constant(value), True
+            raise self._fail(node)
+
+        if isinstance(node, ast.UnaryOp):
+            operand, is_const = self._expr(node.operand)
+            if isinstance(node.op, ast.Not):
+                if is_const:
+                    return _constant(not operand(None)), True
+                return (lambda state: not operand(state)), False
+            if isinstance(node.op, ast.USub) and is_const:
+                value = operand(None)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    return _constant(-value), True
+            raise self._fail(node)
+
+        if isinstance(node, ast.BoolOp):
+            parts = [self._expr(v) for v in node.values]
+            if all(is_const for _, is_const in parts):
+                values = [g(None) for g, _ in parts]
+                return _constant(all(values) if isinstance(node.op, ast.And) else any(values)), True
+            getters = tuple(g for g, _ in parts)
+            if isinstance(node.op, ast.And):
+                if len(getters) == 2:
+                    a, b = getters
+                    return (lambda state: bool(a(state)) and bool(b(state))), False
+
+                def all_of(state):
+                    for g in getters:
+                        if not g(state):
+                            return False
+                    return True
+                return all_of, False
+            if len(getters) == 2:
+                a, b = getters
+                return (lambda state: bool(a(state)) or bool(b(state))), False
+
+            def any_of(state):
+                for g in getters:
+                    if g(state):
+                        return True
+                return False
+            return any_of, False
+
+        if isinstance(node, ast.Compare):
+            left, left_const = self._expr(node.left)
+            links = []
+            all_const = left_const
+            prev = left
+            last = len(node.ops) - 1
+            for i, (op, comparator) in enumerate(zip(node.ops, node.comparators)):
+                if isinstance(comparator, (ast.Tuple, ast.List, ast.Set)):
+                    # Collection literals only make sense as the right side of a membership test
+                    if not isinstance(op, (ast.In, ast.NotIn)) or i != last:
+                        raise self._fail(comparator)
+                    right, right_const = self._membership_literal(comparator)
+                else:
+                    right, right_const = self._expr(comparator)
+                links.append(self._compare(op, prev, right, right_const, comparator))
+                all_const = all_const and right_const
+                prev = right
+            if len(links) == 1:
+                check = links[0]
+            else:
+                checks = tuple(links)
+
+                def check(state):
+                    for link in checks:
+                        if not link(state):
+                            return False
+                    return True
+            if all_const:
+                return _constant(check(None)), True
+            return check, False
+
+        raise self._fail(node)
+
+    def _membership_literal(self, node: ast.AST):
+        # Membership literals hold scalars only; nested collections would be frozen
+        # into values that a state list or dict can never compare equal to
+        values = []
+        for elt in node.elts:
+            if not isinstance(elt, (ast.Constant, ast.UnaryOp)):
+                raise self._fail(node)
+            getter, is_const = self._expr(elt)
+            if not is_const:
+                raise self._fail(node)
+            values.append(getter(None))
+        return _constant(_membership(values)), True
+
+    def _compare(self, op: ast.cmpop, left: Getter, right: Getter, right_const: bool, node: ast.AST) -> Condition:
+        if right_const:
+            return self._compare_constant(op, left, right(None), node)
+
+        if isinstance(op, (ast.In, ast.NotIn)):
+            negate = isinstance(op, ast.NotIn)
+
+            def contains(state):
+                try:
+                    return (left(state) in right(state)) is not negate
+                except TypeError:
+                    return False
+            return contains
+
+        if isinstance(op, (ast.Is, ast.IsNot)):
+            negate = isinstance(op, ast.IsNot)
+            return lambda state: (left(state) is right(state)) is not negate
+
+        fn = _COMPARE_OPS.get(type(op))
+        if fn is None:
+            raise self._fail(node)
+
+        if fn is operator.eq or fn is operator.ne:
+            return lambda state: fn(left(state), right(state))
+
+        # Ordering against a missing value (None) is treated as a non-match
+        def ordered(state):
+            try:
+                return fn(left(state), right(state))
+            except TypeError:
+                return False
+        return ordered
+
+    def _compare_constant(self, op: ast.cmpop, left: Getter, value: Any, node: ast.AST) -> Condition:
+        # Fast path for the usual `input_state.<path> <op> <literal or config>` shape:
+        # the right-hand value is bound into the closure instead of fetched per call
+        if isinstance(op, (ast.In, ast.NotIn)):
+            negate = isinstance(op, ast.NotIn)
+            if isinstance(value, (list, tuple, set)):
+                value = _membership(value)
+
+            def contains(state):
+                try:
+                    return (left(state) in value) is not negate
+                except TypeError:
+                    return False
+            return contains
+
+        if isinstance(op, ast.Is):
+            return lambda state: left(state) is value
+        if isinstance(op, ast.IsNot):
+            return lambda state: left(state) is not value
+        if isinstance(op, ast.Eq):
+            return lambda state: left(state) == value
+        if isinstance(op, ast.NotEq):
+            return lambda state: left(state) != value
+
+        fn = _COMPARE_OPS.get(type(op))
+        if fn is None:
+            raise self._fail(node)
+
+        def ordered(state):
+            try:
+                return fn(left(state), value)
+            except TypeError:
+                return False
+        return ordered
+
+
+def compile_condition(source: str, config: Optional[Dict[str, Any]] = None) -> Condition:
+    """
+    Compile a workflow.json condition string into a `state -> bool` callable.
+    """
+    return _Compiler(source, config or {}).compile()
+
+
+class ApprovalPolicy:
+    """
+    Ordered approval rules compiled from workflow.json. The first matching rule wins.
+    """
+    def __init__(self, rules: List[tuple], default: ApprovalDecision):
+        self._rules = tuple(rules)
+        self.default = default
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> "ApprovalPolicy":
+        config = config or {}
+        default_spec = spec.get("default", {})
+        default = ApprovalDecision(
+            default_spec.get("approval_status", "AUTO_APPROVED"),
+            default_spec.get("approver_id", "SYSTEM"),
+            default_spec.get("name", "default"),
+        )
+        rules = []
+        for i, rule in enumerate(spec.get("rules", [])):
+            if "when" not in rule or "approval_status" not in rule:
+                raise PolicyError(f"Approval rule #{i} must define 'when' and 'approval_status'")
+            name = rule.get("name", f"rule_{i}")
+            decision = ApprovalDecision(rule["approval_status"], rule.get("approver_id", default.approver_id), name)
+            rules.append((compile_condition(rule["when"], config), decision))
+        return cls(rules, default)
+
+    def evaluate(self, state: Dict[str, Any]) -> ApprovalDecision:
+        for condition, decision in self._rules:
+            if condition(state):
+                return decision
+        return self.default
+
+    def evaluate_many(self, states: Iterable[Dict[str, Any]]) -> List[ApprovalDecision]:
+        """
+        Evaluate the policy across many invoice states, e.g. for what-if analysis
+        against a policy compiled with overridden config thresholds.
+        """
+        rules = self._rules
+        default = self.default
+        results = []
+        append = results.append
+        for state in states:
+            for condition, decision in rules:
+                if condition(state):
+                    append(decision)
+                    break
+            else:
+                append(default)
+        return results
+
+
+def load_policies(wf_config: Dict[str, Any], config_overrides: Optional[Dict[str, Any]] = None):
+    """
+    Compile the HITL trigger condition and the approval policy from a parsed workflow.json.
+
+    Returns `(needs_review, approval_policy)`. `config_overrides` replaces values from the
+    `config` block, which is how what-if thresholds are evaluated without editing the file.
+    """
+    config = dict(wf_config.get("config", {}))
+    if config_overrides:
+        config.update(config_overrides)
+
+    checkpoint_stage = next((s for s in wf_config["stages"] if s.get("trigger_condition")), None)
+    condition_str = checkpoint_stage["trigger_condition"] if checkpoint_stage else "False"
+    needs_review = compile_condition(condition_str, config)
+
+    approve_stage = next((s for s in wf_config["stages"] if s["id"] == "APPROVE"), {})
+    approval_policy = ApprovalPolicy.from_spec(approve_stage.get("approval_policy", {}), config)
+
+    return needs_review, approval_policy
@@ -0,0 +1,206 @@
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from bigtool import BigtoolPicker
+from mcp_client import MCPClient
+
+ERP_POOL = ["sap_sandbox", "netsuite", "mock_erp"]
+
+
+class PostingError(RuntimeError):
+    """
+    Raised to a waiting invoice thread when its bulk ERP posting could not be completed.
+    """
+
+
+class PostingRequest(NamedTuple):
+    idempotency_key: str
+    invoice_id: str
+    amount: float
+    currency: str
+    accounting_entries: List[Dict[str, Any]]
+
+
+class PostingResult(NamedTuple):
+    posted: bool
+    erp_txn_id: Optional[str]
+    scheduled_payment_id: Optional[str]
+    erp_tool: str
+    batch_id: str
+
+
+def posting_idempotency_key(state: Dict[str, Any]) -> str:
+    # Stable per invoice, so a replayed POSTING stage never double-posts
+    payload = state["invoice_payload"]
+    return f"post:{payload['invoice_id']}:{payload.get('vendor_tax_id', '')}"
+
+
+def batch_id_for(keys: List[str]) -> str:
+    # Derived from the documents alone so a retried batch reuses the same id
+    digest = hashlib.sha256("\n".join(sorted(keys)).encode("utf-8")).hexdigest()
+    return f"BATCH-{digest[:16]}"
+
+
+def submit_to_erp(batch_id: str, requests: List[PostingRequest]) -> Dict[str, PostingResult]:
+    """
+    Default bulk submitter: one bulk ERP post and one bulk payment call per batch.
+
+    Payments are only scheduled for documents the ERP accepted; rejected documents
+    come back with `posted=False` and no payment id.
+    """
+    erp_tool = BigtoolPicker.select("erp_connector", ERP_POOL)
+    documents = [r._asdict() for r in requests]
+    post = MCPClient.execute_ability("ATLAS", "bulk_post_to_erp", {
+        "tool": erp_tool,
+        "batch_id": batch_id,
+        "documents": documents,
+    })
+    posted = {p["idempotency_key"]: p for p in post["results"] if p.get("posted")}
+    results = {
+        p["idempotency_key"]: PostingResult(False, p.get("erp_txn_id"), None, erp_tool, batch_id)
+        for p in post["results"] if not p.get("posted")
+    }
+    if not posted:
+        return results
+
+    pay = MCPClient.execute_ability("ATLAS", "bulk_schedule_payment", {
+        "batch_id": batch_id,
+        "documents": [
+            {"idempotency_key": d["idempotency_key"], "amount": d["amount"], "currency": d["currency"]}
+            for d in documents if d["idempotency_key"] in posted
+        ],
+    })
+    # A posted document without a payment id is left out so its thread gets a PostingError
+    for p in pay["results"]:
+        key = p["idempotency_key"]
+        if key in posted:
+            results[key] = PostingResult(True, posted[key]["erp_txn_id"], p["scheduled_payment_id"], erp_tool, batch_id)
+    return results
+
+
+class _Batch:
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.requests: Dict[str, PostingRequest] = {}
+        self.sealed = False
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Dict[str, PostingResult] = {}
+        self.error: Optional[BaseException] = None
+
+
+class PostingCoalescer:
+    """
+    Buffers POSTING requests from concurrent invoice threads for up to `max_wait_ms`
+    or `max_batch_size` documents, submits them as one bulk ERP call and hands each
+    waiting thread its own result.
+
+    The first thread to join a batch waits out the window; whichever thread seals the
+    batch (window expired or batch full) performs the submission. Failed submissions
+    are retried with the same batch id and idempotency keys.
+    """
+    def __init__(
+        self,
+        max_batch_size: int = 50,
+        max_wait_ms: float = 25.0,
+        max_retries: int = 3,
+        backoff_seconds: float = 2.0,
+        submit_batch: Callable[[str, List[PostingRequest]], Dict[str, PostingResult]] = submit_to_erp,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._submit_batch = submit_batch
+        self._lock = threading.Lock()
+        self._current: Optional[_Batch] = None
+        self.stats = {"batches": 0, "documents": 0, "erp_attempts": 0}
+
+    @classmethod
+    def from_config(cls, wf_config: Dict[str, Any], **kwargs) -> "PostingCoalescer":
+        posting_stage = next((s for s in wf_config["stages"] if s["id"] == "POSTING"), {})
+        batching = posting_stage.get("batching", {})
+        retry = wf_config.get("error_handling", {}).get("retry_policy", {})
+        options = {
+            "max_batch_size": batching.get("max_batch_size", 50),
+            "max_wait_ms": batching.get("max_wait_ms", 25.0),
+            "max_retries": retry.get("max_retries", 3),
+            "backoff_seconds": retry.get("backoff_seconds", 2.0),
+        }
+        options.update(kwargs)
+        return cls(**options)
+
+    def post(self, request: PostingRequest) -> PostingResult:
+        """
+        Enqueue one invoice for posting and block until its batch has been submitted.
+        """
+        leader = False
+        with self._lock:
+            batch = self._current
+            if batch is None:
+                batch = self._current = _Batch(time.monotonic() + self.max_wait)
+                leader = True
+            # A duplicate key in the same window shares the original document's result,
+            # but only when it carries the same payload
+            existing = batch.requests.get(request.idempotency_key)
+            if existing is None:
+                batch.requests[request.idempotency_key] = request
+            elif existing != request:
+                raise PostingError(
+                    f"Idempotency key {request.idempotency_key!r} reused for {request.invoice_id} with a different payload"
+                )
+            should_flush = len(batch.requests) >= self.max_batch_size and self._seal(batch)
+
+        if should_flush:
+            batch.full.set()
+            self._flush(batch)
+        elif leader:
+            batch.full.wait(max(batch.deadline - time.monotonic(), 0.0))
+            with self._lock:
+                should_flush = self._seal(batch)
+            if should_flush:
+                self._flush(batch)
+
+        batch.done.wait()
+        if batch.error is not None:
+            raise PostingError(f"Bulk ERP posting failed for {request.invoice_id}: {batch.error}") from batch.error
+        result = batch.results.get(request.idempotency_key)
+        if result is None:
+            raise PostingError(f"ERP returned no result for {request.invoice_id} ({request.idempotency_key})")
+        return result
+
+    def _seal(self, batch: _Batch) -> bool:
+        # Caller holds self._lock; only the sealing thread flushes the batch
+        if batch.sealed:
+            return False
+        batch.sealed = True
+        if self._current is batch:
+            self._current = None
+        return True
+
+    def _flush(self, batch: _Batch):
+        requests = list(batch.requests.values())
+        batch_id = batch_id_for(list(batch.requests))
+        try:
+            for attempt in range(self.max_retries + 1):
+                with self._lock:
+                    self.stats["erp_attempts"] += 1
+                try:
+                    batch.results = self._submit_batch(batch_id, requests)
+                    break
+                except Exception as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    print(f"[Posting] Batch {batch_id} failed ({e}); retrying in {self.backoff_seconds}s")
+                    time.sleep(self.backoff_seconds)
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["documents"] += len(requests)
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
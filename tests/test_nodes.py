@@ -0,0 +1,75 @@
+import nodes
+from posting import PostingCoalescer, PostingResult
+
+
+def invoice_state(currency="USD", **extra):
+    state = {
+        "invoice_payload": {"invoice_id": "INV-1", "vendor_tax_id": "TAX", "amount": 100.0, "currency": currency.lower()},
+        "normalized_invoice": {"amount": 100.0, "currency": currency},
+        "accounting_entries": [],
+        "audit_log": [],
+    }
+    state.update(extra)
+    return state
+
+
+def coalescer_returning(posted=True, calls=None):
+    def submit(batch_id, requests):
+        if calls is not None:
+            calls.extend(requests)
+        return {
+            r.idempotency_key: PostingResult(posted, "ERP-1", "PAY-1" if posted else None, "mock_erp", batch_id)
+            for r in requests
+        }
+    return PostingCoalescer(max_batch_size=1, submit_batch=submit)
+
+
+def test_posting_node_posted():
+    update = nodes.posting_node(invoice_state(), coalescer=coalescer_returning())
+    assert update["posted"] is True
+    assert update["scheduled_payment_id"] == "PAY-1"
+    assert "workflow_status" not in update
+
+
+def test_posting_node_rejected_fails_workflow():
+    update = nodes.posting_node(invoice_state(), coalescer=coalescer_returning(posted=False))
+    assert update["posted"] is False
+    assert update["scheduled_payment_id"] is None
+    assert update["workflow_status"] == "FAILED"
+
+
+def test_posting_node_error_fails_workflow():
+    def submit(batch_id, requests):
+        raise ConnectionError("ERP down")
+    coalescer = PostingCoalescer(max_batch_size=1, max_retries=0, submit_batch=submit)
+
+    update = nodes.posting_node(invoice_state(), coalescer=coalescer)
+
+    assert update["posted"] is False
+    assert update["workflow_status"] == "FAILED"
+    assert "ERP down" in update["audit_log"][-1]
+
+
+def test_posting_node_sends_normalized_currency():
+    calls = []
+    nodes.posting_node(invoice_state(currency="EUR"), coalescer=coalescer_returning(calls=calls))
+    assert [r.currency for r in calls] == ["EUR"]
+
+
+def test_escalation_pauses_for_approver_and_resumes_approved():
+    state = invoice_state(approval_status="ESCALATED", approver_id="CFO", match_result="MATCHED")
+
+    checkpoint = nodes.checkpoint_node(state)
+    assert checkpoint["workflow_status"] == "PAUSED"
+    assert checkpoint["paused_reason"] == "Escalated to CFO by approval policy"
+
+    state.update(checkpoint, human_decision="ACCEPT", reviewer_id="REV-9")
+    decision = nodes.hitl_decision_node(state)
+    assert decision["approval_status"] == "APPROVED"
+    assert decision["approver_id"] == "REV-9"
+    assert decision["workflow_status"] == "IN_PROGRESS"
+
+
+def test_rejected_escalation_is_manual_handoff():
+    state = invoice_state(approval_status="ESCALATED", approver_id="CFO", human_decision="REJECT", reviewer_id="REV-9")
+    assert nodes.hitl_decision_node(state)["workflow_status"] == "MANUAL_HANDOFF"
@@ -0,0 +1,193 @@
+import json
+import os
+
+import pytest
+
+from policy import ApprovalPolicy, PolicyError, compile_condition, load_policies
+
+WORKFLOW_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workflow.json")
+
+
+@pytest.fixture(scope="module")
+def wf_config():
+    with open(WORKFLOW_PATH, "r") as f:
+        return json.load(f)
+
+
+def invoice_state(amount=1000.0, currency="USD", risk_score=0.1):
+    return {
+        "invoice_payload": {"amount": amount, "currency": currency.lower()},
+        "normalized_invoice": {"amount": amount, "currency": currency},
+        "flags": {"missing_info": [], "risk_score": risk_score},
+    }
+
+
+# --- compiler ---
+
+def test_equality_against_state():
+    cond = compile_condition("input_state.match_result == 'FAILED'")
+    assert cond({"match_result": "FAILED"}) is True
+    assert cond({"match_result": "MATCHED"}) is False
+    assert cond({}) is False
+
+
+def test_constant_folding():
+    always = compile_condition("config.limit > 5 and not False", {"limit": 10})
+    never = compile_condition("False")
+    assert always({}) is True
+    assert never({"anything": 1}) is False
+
+
+def test_config_values_are_resolved_at_compile_time():
+    config = {"limit": 10}
+    cond = compile_condition("input_state.amount > config.limit", config)
+    config["limit"] = 1000
+    assert cond({"amount": 11}) is True
+
+
+def test_chained_comparison():
+    cond = compile_condition("1 < input_state.x <= 3")
+    assert [cond({"x": x}) for x in (1, 2, 3, 4)] == [False, True, True, False]
+
+
+def test_in_and_not_in_against_config_list():
+    config = {"currencies": ["USD", "EUR"]}
+    is_in = compile_condition("input_state.c in config.currencies", config)
+    not_in = compile_condition("input_state.c not in config.currencies", config)
+    assert is_in({"c": "EUR"}) and not not_in({"c": "EUR"})
+    assert not is_in({"c": "JPY"}) and not_in({"c": "JPY"})
+
+
+def test_in_against_literal_with_negative_numbers():
+    cond = compile_condition("input_state.x in (1, -2)")
+    assert cond({"x": -2}) is True
+    assert cond({"x": 2}) is False
+
+
+def test_membership_in_config_list_of_unhashables():
+    cond = compile_condition("input_state.x in config.values", {"values": [[1], 2]})
+    assert cond({"x": [1]}) is True
+    assert cond({"x": [2]}) is False
+
+
+def test_config_list_equality_compares_the_list():
+    cond = compile_condition("input_state.x == config.values", {"values": ["A", "B"]})
+    assert cond({"x": ["A", "B"]}) is True
+    assert cond({"x": ["B", "A"]}) is False
+
+
+def test_bare_path_returns_bool():
+    cond = compile_condition("input_state.flags.missing_info")
+    assert cond({"flags": {"missing_info": ["tax_id"]}}) is True
+    assert cond({"flags": {"missing_info": []}}) is False
+    assert cond({}) is False
+
+
+def test_missing_keys_read_as_none():
+    cond = compile_condition("input_state.a.b.c is None")
+    assert cond({}) is True
+    assert cond({"a": "not-a-dict"}) is True
+    assert cond({"a": {"b": {"c": 0}}}) is False
+
+
+def test_ordering_against_missing_value_is_false():
+    gt = compile_condition("input_state.amount > 10")
+    le = compile_condition("input_state.amount <= 10")
+    assert gt({}) is False
+    assert le({}) is False
+    assert le({"amount": None}) is False
+
+
+def test_boolean_operators_short_circuit():
+    cond = compile_condition("input_state.a or input_state.b > 1 or input_state.c")
+    assert cond({"a": 1})
+    assert cond({"b": 2})
+    assert cond({"c": True})
+    assert not cond({"b": 0})
+    both = compile_condition("input_state.a and input_state.b and input_state.c")
+    assert both({"a": 1, "b": 1, "c": 1})
+    assert not both({"a": 1, "b": 1})
+
+
+@pytest.mark.parametrize("source", [
+    "len(input_state.items) > 1",
+    "input_state.amount + 1 > 2",
+    "other.amount > 1",
+    "amount > 1",
+    "input_state.a in [[1]]",
+    "input_state.a in [input_state.b]",
+    "input_state.a == [1, 2]",
+    "input_state.a < (1,)",
+    "[1] in input_state.a",
+    "input_state.a in (1, 2) == True",
+    "input_state.a == -'b'",
+    "input_state.a in ('a', -'b')",
+    "input_state.a == -True",
+    "input_state.amount >",
+    "config.missing > 1",
+])
+def test_unsupported_syntax_raises_policy_error(source):
+    with pytest.raises(PolicyError):
+        compile_condition(source, {"limit": 1})
+
+
+# --- approval policy ---
+
+def test_first_matching_rule_wins():
+    policy = ApprovalPolicy.from_spec({
+        "rules": [
+            {"name": "big", "when": "input_state.amount > 100", "approval_status": "ESCALATED", "approver_id": "CFO"},
+            {"name": "medium", "when": "input_state.amount > 10", "approval_status": "ESCALATED", "approver_id": "MANAGER"},
+        ],
+    })
+    assert policy.evaluate({"amount": 500}).approver_id == "CFO"
+    assert policy.evaluate({"amount": 50}).approver_id == "MANAGER"
+    decision = policy.evaluate({"amount": 5})
+    assert (decision.approval_status, decision.approver_id, decision.rule) == ("AUTO_APPROVED", "SYSTEM", "default")
+
+
+def test_rule_without_condition_raises():
+    with pytest.raises(PolicyError):
+        ApprovalPolicy.from_spec({"rules": [{"approval_status": "ESCALATED"}]})
+
+
+def test_evaluate_many_matches_evaluate(wf_config):
+    _, policy = load_policies(wf_config)
+    states = [invoice_state(amount=a, currency=c) for a in (10.0, 20_000.0, 200_000.0) for c in ("USD", "JPY")]
+    assert policy.evaluate_many(states) == [policy.evaluate(s) for s in states]
+
+
+def test_config_overrides_for_what_if(wf_config):
+    _, policy = load_policies(wf_config, {"auto_approve_limit": 50_000})
+    assert policy.evaluate(invoice_state(amount=20_000.0)).approval_status == "AUTO_APPROVED"
+
+
+# --- shipped workflow.json rules ---
+
+def test_trigger_condition(wf_config):
+    needs_review, _ = load_policies(wf_config)
+    assert needs_review({"match_result": "FAILED"}) is True
+    assert needs_review({"match_result": "MATCHED"}) is False
+
+
+@pytest.mark.parametrize("state, expected", [
+    (invoice_state(amount=10_000.0), ("AUTO_APPROVED", "SYSTEM", "under_threshold")),
+    (invoice_state(amount=10_000.01), ("ESCALATED", "FINANCE_MANAGER", "auto_approve_limit")),
+    (invoice_state(amount=100_000.0), ("ESCALATED", "FINANCE_MANAGER", "auto_approve_limit")),
+    (invoice_state(amount=100_000.01), ("ESCALATED", "CFO", "executive_limit")),
+    (invoice_state(risk_score=0.69), ("AUTO_APPROVED", "SYSTEM", "under_threshold")),
+    (invoice_state(risk_score=0.7), ("ESCALATED", "RISK_REVIEW", "vendor_risk")),
+    (invoice_state(currency="GBP"), ("AUTO_APPROVED", "SYSTEM", "under_threshold")),
+    (invoice_state(currency="JPY"), ("ESCALATED", "TREASURY", "foreign_currency")),
+    (invoice_state(amount=200_000.0, risk_score=0.9, currency="JPY"), ("ESCALATED", "CFO", "executive_limit")),
+])
+def test_shipped_rules_at_boundaries(wf_config, state, expected):
+    _, policy = load_policies(wf_config)
+    assert tuple(policy.evaluate(state)) == expected
+
+
+def test_foreign_currency_uses_normalized_currency(wf_config):
+    _, policy = load_policies(wf_config)
+    state = invoice_state(currency="USD")
+    state["invoice_payload"]["currency"] = "usd"
+    assert policy.evaluate(state).approval_status == "AUTO_APPROVED"
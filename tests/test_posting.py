@@ -0,0 +1,192 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+import posting
+from mcp_client import MCPClient
+from posting import PostingCoalescer, PostingError, PostingRequest, PostingResult, batch_id_for
+
+JOIN_TIMEOUT = 5.0
+
+
+def make_request(i, amount=100.0):
+    return PostingRequest(f"post:INV-{i}:TAX", f"INV-{i}", amount, "USD", [])
+
+
+class RecordingERP:
+    def __init__(self, fail_times=0, drop_keys=()):
+        self.calls = []
+        self.fail_times = fail_times
+        self.drop_keys = set(drop_keys)
+        self.lock = threading.Lock()
+
+    def __call__(self, batch_id, requests):
+        with self.lock:
+            self.calls.append((batch_id, [r.idempotency_key for r in requests]))
+            attempt = len(self.calls)
+        if attempt <= self.fail_times:
+            raise ConnectionError("ERP connection reset")
+        return {
+            r.idempotency_key: PostingResult(True, f"ERP-{r.invoice_id}", f"PAY-{r.invoice_id}", "mock_erp", batch_id)
+            for r in requests if r.idempotency_key not in self.drop_keys
+        }
+
+
+def post_concurrently(coalescer, requests, stagger=0.0):
+    """
+    Post each request from its own thread; returns results/exceptions in request order.
+    Fails the test if any thread is still blocked after JOIN_TIMEOUT.
+    """
+    outcomes = [None] * len(requests)
+
+    def worker(i, request):
+        try:
+            outcomes[i] = coalescer.post(request)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i, r), daemon=True) for i, r in enumerate(requests)]
+    for t in threads:
+        t.start()
+        if stagger:
+            time.sleep(stagger)
+    for t in threads:
+        t.join(JOIN_TIMEOUT)
+    assert not any(t.is_alive() for t in threads), "posting thread did not return"
+    return outcomes
+
+
+def test_flushes_when_batch_is_full():
+    erp = RecordingERP()
+    coalescer = PostingCoalescer(max_batch_size=4, max_wait_ms=60_000, submit_batch=erp)
+    requests = [make_request(i) for i in range(4)]
+
+    results = post_concurrently(coalescer, requests)
+
+    assert len(erp.calls) == 1
+    assert sorted(erp.calls[0][1]) == sorted(r.idempotency_key for r in requests)
+    assert [r.erp_txn_id for r in results] == [f"ERP-INV-{i}" for i in range(4)]
+    assert [r.scheduled_payment_id for r in results] == [f"PAY-INV-{i}" for i in range(4)]
+    assert coalescer.stats == {"batches": 1, "documents": 4, "erp_attempts": 1}
+
+
+def test_flushes_when_window_expires():
+    erp = RecordingERP()
+    coalescer = PostingCoalescer(max_batch_size=100, max_wait_ms=50, submit_batch=erp)
+
+    start = time.monotonic()
+    results = post_concurrently(coalescer, [make_request(i) for i in range(3)])
+    elapsed = time.monotonic() - start
+
+    assert len(erp.calls) == 1
+    assert len(erp.calls[0][1]) == 3
+    assert all(r.posted for r in results)
+    assert elapsed >= 0.05
+
+
+def test_next_request_opens_a_new_batch():
+    erp = RecordingERP()
+    coalescer = PostingCoalescer(max_batch_size=100, max_wait_ms=1, submit_batch=erp)
+
+    first = coalescer.post(make_request(1))
+    second = coalescer.post(make_request(2))
+
+    assert len(erp.calls) == 2
+    assert first.batch_id != second.batch_id
+
+
+def test_persistent_failure_raises_in_every_thread():
+    erp = RecordingERP(fail_times=100)
+    coalescer = PostingCoalescer(max_batch_size=3, max_wait_ms=60_000, max_retries=2, backoff_seconds=0, submit_batch=erp)
+
+    outcomes = post_concurrently(coalescer, [make_request(i) for i in range(3)])
+
+    assert all(isinstance(o, PostingError) for o in outcomes)
+    assert all(isinstance(o.__cause__, ConnectionError) for o in outcomes)
+    assert len(erp.calls) == 3
+    assert coalescer.stats == {"batches": 0, "documents": 0, "erp_attempts": 3}
+
+    # The failed batch is closed; later postings start a fresh one
+    erp.fail_times = 0
+    retried = post_concurrently(coalescer, [make_request(i) for i in range(3, 6)])
+    assert all(r.posted for r in retried)
+
+
+def test_retry_reuses_batch_id_and_keys():
+    erp = RecordingERP(fail_times=1)
+    coalescer = PostingCoalescer(max_batch_size=3, max_wait_ms=60_000, backoff_seconds=0, submit_batch=erp)
+    requests = [make_request(i) for i in range(3)]
+
+    results = post_concurrently(coalescer, requests)
+
+    assert len(erp.calls) == 2
+    assert erp.calls[0] == erp.calls[1]
+    assert erp.calls[0][0] == batch_id_for([r.idempotency_key for r in requests])
+    assert all(r.batch_id == erp.calls[0][0] for r in results)
+
+
+def test_missing_result_raises_only_for_that_request():
+    requests = [make_request(i) for i in range(3)]
+    erp = RecordingERP(drop_keys=[requests[1].idempotency_key])
+    coalescer = PostingCoalescer(max_batch_size=3, max_wait_ms=60_000, submit_batch=erp)
+
+    outcomes = post_concurrently(coalescer, requests)
+
+    assert isinstance(outcomes[1], PostingError)
+    assert outcomes[0].posted and outcomes[2].posted
+
+
+def test_duplicate_key_with_same_payload_shares_result():
+    erp = RecordingERP()
+    coalescer = PostingCoalescer(max_batch_size=100, max_wait_ms=300, submit_batch=erp)
+
+    outcomes = post_concurrently(coalescer, [make_request(1), make_request(1), make_request(2)], stagger=0.01)
+
+    assert len(erp.calls) == 1
+    assert sorted(erp.calls[0][1]) == ["post:INV-1:TAX", "post:INV-2:TAX"]
+    assert outcomes[0] == outcomes[1]
+    assert outcomes[2].erp_txn_id == "ERP-INV-2"
+
+
+def test_duplicate_key_with_different_payload_raises():
+    erp = RecordingERP()
+    coalescer = PostingCoalescer(max_batch_size=100, max_wait_ms=300, submit_batch=erp)
+
+    outcomes = post_concurrently(coalescer, [make_request(1, amount=100.0), make_request(1, amount=999.0)], stagger=0.01)
+
+    assert outcomes[0].posted
+    assert isinstance(outcomes[1], PostingError)
+    assert erp.calls[0][1] == ["post:INV-1:TAX"]
+
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError):
+        PostingCoalescer(max_batch_size=0)
+
+
+def test_submit_to_erp_skips_payment_for_rejected_documents():
+    requests = [make_request(i) for i in range(3)]
+    rejected = requests[0].idempotency_key
+    real = MCPClient.execute_ability
+    calls = []
+
+    def fake(server, ability, params):
+        calls.append((ability, params))
+        result = real(server, ability, params)
+        if ability == "bulk_post_to_erp":
+            for doc in result["results"]:
+                if doc["idempotency_key"] == rejected:
+                    doc["posted"] = False
+        return result
+
+    with mock.patch.object(MCPClient, "execute_ability", side_effect=fake):
+        results = posting.submit_to_erp("BATCH-1", requests)
+
+    paid = [d["idempotency_key"] for ability, params in calls if ability == "bulk_schedule_payment" for d in params["documents"]]
+    assert rejected not in paid
+    assert sorted(paid) == sorted(r.idempotency_key for r in requests[1:])
+    assert results[rejected].posted is False
+    assert results[rejected].scheduled_payment_id is None
+    assert all(results[r.idempotency_key].scheduled_payment_id for r in requests[1:])